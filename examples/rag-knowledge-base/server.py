@@ -6,20 +6,52 @@ This server demonstrates how to integrate Chameleon Framework with a
 Retrieval Augmented Generation (RAG) system using the MCP protocol.
 
 Features:
-- Document search with relevance scoring
+- Document search with BM25 relevance ranking
 - Category filtering
 - Recent document retrieval
 - Returns results as Chameleon ViewContent components
 """
 
 import asyncio
+import functools
+import heapq
 import json
+import math
+import os
+import re
+import threading
+import time
+from array import array
+from collections import Counter, OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from typing import List, Dict, Any
-from dataclasses import dataclass, asdict
+from typing import List, Dict, Any, Optional, Tuple
+from dataclasses import dataclass, replace
+
+# BM25 parameters
+BM25_K1 = 1.2
+BM25_B = 0.65
+
+# Index terms: runs of at least three letters or digits
+TOKEN_RE = re.compile(r"[a-z0-9]{3,}")
+
+# Term frequency weight per document field
+FIELD_WEIGHTS = {"title": 5.0, "tags": 3.0, "content": 2.0}
+
+# Number of tool call results kept by the MCP server
+TOOL_CACHE_SIZE = 256
+
+# Search results kept per normalized query, and for how many seconds
+SEARCH_CACHE_SIZE = 256
+SEARCH_CACHE_TTL = 300
+
+# Worker threads that run large searches off the event loop
+CPU_POOL = ThreadPoolExecutor(max_workers=os.cpu_count())
+# Smallest knowledge base whose searches are worth a thread hand-off
+OFFLOAD_MIN_DOCUMENTS = 10_000
 
 # Simple document store (in production, this would be a vector database)
-@dataclass
+@dataclass(slots=True, frozen=True)
 class Document:
     id: str
     title: str
@@ -135,86 +167,279 @@ KNOWLEDGE_BASE = [
 ]
 
 
+def tokenize(text: str) -> List[str]:
+    """Split text into lowercase terms, dropping punctuation and very short words"""
+    return TOKEN_RE.findall(text.lower())
+
+
+@dataclass(slots=True, frozen=True)
+class SearchIndex:
+    """Immutable snapshot of everything derived from a list of documents
+    
+    The BM25 index is stored as parallel typed arrays in CSR layout: the
+    postings of term id ``t`` are ``indices[indptr[t]:indptr[t + 1]]``
+    (document indexes) with matching field-weighted frequencies in ``tf``.
+    
+    Because the corpus doesn't change between rebuilds, each posting's BM25
+    contribution is also computed up front into ``weights``, so scoring a
+    query only sums precomputed values.
+    """
+    documents: Tuple[Document, ...]
+    vocab: Dict[str, int]
+    indptr: array
+    indices: array
+    tf: array
+    idf: array
+    weights: array
+    doc_len: array
+    avgdl: float
+    recent_docs: Tuple[int, ...]
+    by_time: List[Document]
+    by_category: Dict[str, List[Document]]
+    
+    @classmethod
+    def build(cls, documents: List[Document]) -> "SearchIndex":
+        """Tokenize every document once and build the index"""
+        postings: Dict[str, List[Tuple[int, float]]] = {}
+        doc_len = array("f")
+        recent_docs: List[int] = []
+        
+        for idx, doc in enumerate(documents):
+            fields = {
+                "title": Counter(tokenize(doc.title)),
+                "tags": Counter(t for tag in doc.tags for t in tokenize(tag)),
+                "content": Counter(tokenize(doc.content)),
+            }
+            tf: Counter = Counter()
+            for field, counts in fields.items():
+                weight = FIELD_WEIGHTS[field]
+                for term, count in counts.items():
+                    tf[term] += count * weight
+            
+            doc_len.append(sum(tf.values()))
+            for term, freq in tf.items():
+                postings.setdefault(term, []).append((idx, freq))
+            
+            if "recent" in doc.tags:
+                recent_docs.append(idx)
+        
+        n = len(documents)
+        avgdl = sum(doc_len) / n if n else 0.0
+        
+        vocab: Dict[str, int] = {}
+        indptr = array("i", [0])
+        indices = array("i")
+        tfs = array("f")
+        idfs = array("f")
+        for term_id, (term, docs) in enumerate(postings.items()):
+            vocab[term] = term_id
+            for idx, freq in docs:
+                indices.append(idx)
+                tfs.append(freq)
+            indptr.append(len(indices))
+            idfs.append(math.log((n - len(docs) + 0.5) / (len(docs) + 0.5) + 1))
+        
+        weights = array("f")
+        for term_id, idf in enumerate(idfs):
+            for i in range(indptr[term_id], indptr[term_id + 1]):
+                freq = tfs[i]
+                norm = BM25_K1 * (1 - BM25_B + BM25_B * doc_len[indices[i]] / avgdl)
+                weights.append(idf * freq * (BM25_K1 + 1) / (freq + norm))
+        
+        # Order by recency once, rather than on every get_recent call
+        by_time = sorted(documents, key=lambda d: d.timestamp, reverse=True)
+        
+        # category -> documents, newest first
+        by_category: Dict[str, List[Document]] = {}
+        for doc in by_time:
+            by_category.setdefault(doc.category, []).append(doc)
+        
+        return cls(
+            documents=tuple(documents),
+            vocab=vocab,
+            indptr=indptr,
+            indices=indices,
+            tf=tfs,
+            idf=idfs,
+            weights=weights,
+            doc_len=doc_len,
+            avgdl=avgdl,
+            recent_docs=tuple(recent_docs),
+            by_time=by_time,
+            by_category=by_category,
+        )
+
+
 class RAGKnowledgeBase:
-    """Simple RAG implementation using keyword matching"""
+    """Simple RAG implementation using BM25 keyword ranking"""
     
     def __init__(self):
         self.documents = KNOWLEDGE_BASE
+        
+        # normalized query -> (time cached, results)
+        self._search_cache: "OrderedDict[Tuple, Tuple[float, List[Document]]]" = OrderedDict()
+        # Searches may run concurrently in worker threads
+        self._search_lock = threading.Lock()
+        # Bumped by refresh() so in-flight searches don't cache stale results
+        self._generation = 0
+        
+        self.refresh()
+    
+    @property
+    def generation(self) -> int:
+        """Number of times the knowledge base has been (re)built"""
+        return self._generation
     
-    def search(self, query: str, max_results: int = 5) -> List[Document]:
+    def refresh(self):
+        """Rebuild everything derived from self.documents and drop cached results
+        
+        Call this after modifying the knowledge base. The new index is built
+        aside and swapped in at once, so concurrent searches see either the
+        old or the new snapshot, never a partial one.
+        """
+        index = SearchIndex.build(self.documents)
+        
+        with self._search_lock:
+            self._index = index
+            self._generation += 1
+            self._search_cache.clear()
+        _static_card.cache_clear()
+    
+    def search(self, query: str, max_results: Optional[int] = 5) -> List[Document]:
         """Search documents by query"""
         query_lower = query.lower()
-        terms = [t for t in query_lower.split() if len(t) > 2]
+        # Repeated query terms shouldn't count twice
+        terms = list(dict.fromkeys(tokenize(query_lower)))
+        boost_recent = "recent" in query_lower
         
-        # Score each document
-        scored_docs = []
-        for doc in self.documents:
-            score = self._calculate_relevance(doc, terms, query_lower)
-            if score > 0:
-                # Create a copy with updated relevance score
-                doc_dict = asdict(doc)
-                doc_dict['relevance'] = min(score / 10, 1.0)  # Normalize to 0-1
-                scored_docs.append((score, Document(**doc_dict)))
+        # Scoring ignores term order and case, so queries that only differ
+        # in those (e.g. "Machine learning" / "learning machine") share an entry
+        key = (tuple(sorted(terms)), boost_recent, max_results)
+        now = time.monotonic()
+        with self._search_lock:
+            entry = self._search_cache.get(key)
+            if entry is not None and now - entry[0] <= SEARCH_CACHE_TTL:
+                self._search_cache.move_to_end(key)
+                return list(entry[1])
+            generation = self._generation
         
-        # Sort by score and return top results
-        scored_docs.sort(reverse=True, key=lambda x: x[0])
-        return [doc for _, doc in scored_docs[:max_results]]
+        results = self._rank(terms, boost_recent, max_results)
+        with self._search_lock:
+            if generation != self._generation:
+                # The knowledge base was refreshed while ranking
+                return list(results)
+            self._search_cache[key] = (now, results)
+            self._search_cache.move_to_end(key)
+            if len(self._search_cache) > SEARCH_CACHE_SIZE:
+                self._search_cache.popitem(last=False)
+        return list(results)
     
-    def _calculate_relevance(self, doc: Document, terms: List[str], query: str) -> float:
-        """Calculate relevance score for a document"""
-        score = 0.0
+    def _rank(self, terms: List[str], boost_recent: bool, max_results: Optional[int]) -> List[Document]:
+        """Score documents against query terms and return the best matches"""
+        # Work from one snapshot even if refresh() swaps in a new index
+        index = self._index
+        scores = self._score(index, terms)
         
-        # Check title (highest weight)
-        for term in terms:
-            if term in doc.title.lower():
-                score += 5.0
-        
-        # Check content
-        for term in terms:
-            if term in doc.content.lower():
-                score += 2.0
+        # Boost recent documents if "recent" in query
+        if boost_recent:
+            for idx in index.recent_docs:
+                scores[idx] = scores.get(idx, 0.0) + 10.0
         
-        # Check tags
-        for term in terms:
-            for tag in doc.tags:
-                if term in tag.lower():
-                    score += 3.0
+        scored = []
+        for idx, score in scores.items():
+            # Use base relevance as multiplier
+            score *= index.documents[idx].relevance
+            if score > 0:
+                scored.append((score, idx))
         
-        # Boost recent documents if "recent" in query
-        if "recent" in query and "recent" in doc.tags:
-            score += 10.0
+        # Select the top results, then copy only those with updated
+        # relevance score, normalized to 0-1
+        if max_results is None or max_results < 0:
+            # Keep slice semantics, like get_recent and get_by_category:
+            # None returns every match, a negative limit drops from the end
+            top = sorted(scored, key=lambda x: x[0], reverse=True)[:max_results]
+        else:
+            top = heapq.nlargest(max_results, scored, key=lambda x: x[0])
+        return [
+            replace(index.documents[idx], relevance=min(score / 10, 1.0))
+            for score, idx in top
+        ]
+    
+    @staticmethod
+    def _score(index: SearchIndex, terms: List[str]) -> Dict[int, float]:
+        """Accumulate BM25 scores for the documents matching any term"""
+        scores: Dict[int, float] = {}
         
-        # Use base relevance as multiplier
-        score *= doc.relevance
+        for term in terms:
+            term_id = index.vocab.get(term)
+            if term_id is None:
+                continue
+            start, end = index.indptr[term_id], index.indptr[term_id + 1]
+            for idx, weight in zip(index.indices[start:end], index.weights[start:end]):
+                scores[idx] = scores.get(idx, 0.0) + weight
         
-        return score
+        return scores
     
     def get_by_category(self, category: str, max_results: int = 5) -> List[Document]:
-        """Get documents by category"""
-        return [doc for doc in self.documents if doc.category == category][:max_results]
+        """Get the most recent documents in a category"""
+        try:
+            docs = self._index.by_category.get(category, [])
+        except TypeError:
+            # Unhashable argument (e.g. a JSON list) can't name a category
+            return []
+        return docs[:max_results]
     
     def get_recent(self, max_results: int = 5) -> List[Document]:
         """Get most recent documents"""
-        sorted_docs = sorted(self.documents, key=lambda d: d.timestamp, reverse=True)
-        return sorted_docs[:max_results]
+        return self._index.by_time[:max_results]
+
+
+# Card action labels
+VIEW_LABEL = "📖 View Full"
+RELATED_LABEL = "🔗 Related"
+
+# Fixed shape of every document card; per-document fields are patched in
+CARD_TEMPLATE: Dict[str, Any] = {
+    "type": "component",
+    "component_name": "card",
+    "data": {"title": None, "subtitle": None, "content": None, "actions": None},
+    "layer": "focus",
+}
+
+# Card actions; each id gets "-<document id>" appended
+CARD_ACTIONS = (
+    {"id": "view", "label": VIEW_LABEL, "variant": "primary"},
+    {"id": "related", "label": RELATED_LABEL, "variant": "text"},
+)
+
+
+@functools.lru_cache(maxsize=None)
+def _static_card(
+    doc_id: str, title: str, category: str, timestamp: str, excerpt: str
+) -> Tuple[Dict[str, Any], str]:
+    """Build the query-independent part of a document card (shared, don't modify)
+    
+    Returns the card and the subtitle prefix the relevance is appended to.
+    The actions are kept as a tuple; document_to_card copies them per card.
+    """
+    actions = tuple({**action, "id": f"{action['id']}-{doc_id}"} for action in CARD_ACTIONS)
+    card = {**CARD_TEMPLATE}
+    card["data"] = {**CARD_TEMPLATE["data"], "title": title, "content": excerpt, "actions": actions}
+    return card, f"{category} • {timestamp} • Relevance: "
 
 
 def document_to_card(doc: Document) -> Dict[str, Any]:
     """Convert a Document to a Chameleon Card component"""
-    return {
-        "type": "component",
-        "component_name": "card",
-        "data": {
-            "title": doc.title,
-            "subtitle": f"{doc.category} • {doc.timestamp} • Relevance: {int(doc.relevance * 100)}%",
-            "content": doc.excerpt,
-            "actions": [
-                {"id": f"view-{doc.id}", "label": "📖 View Full", "variant": "primary"},
-                {"id": f"related-{doc.id}", "label": "🔗 Related", "variant": "text"},
-            ]
-        },
-        "layer": "focus"
+    static, subtitle_prefix = _static_card(doc.id, doc.title, doc.category, doc.timestamp, doc.excerpt)
+    # Only the subtitle depends on the query, through the relevance score.
+    # Every card gets its own actions, so callers can modify what they receive.
+    card = {**static}
+    card["data"] = {
+        **static["data"],
+        "subtitle": f"{subtitle_prefix}{int(doc.relevance * 100)}%",
+        "actions": [dict(action) for action in static["data"]["actions"]],
     }
+    return card
 
 
 # MCP Server Implementation (simplified - in production use the MCP SDK)
@@ -223,9 +448,67 @@ class MCPServer:
     
     def __init__(self):
         self.rag = RAGKnowledgeBase()
+        # (tool, arguments) -> (documents, metadata) of a previous call
+        self._cache: "OrderedDict[Tuple[str, Tuple], Tuple[Tuple[Document, ...], Dict[str, Any]]]" = OrderedDict()
     
     async def handle_tool_call(self, tool_name: str, arguments: Dict[str, Any]) -> Dict[str, Any]:
-        """Handle MCP tool calls"""
+        """Handle MCP tool calls, serving repeated calls from an LRU cache
+        
+        The cache holds the (frozen) result documents rather than responses;
+        every call gets a freshly built response it is free to modify.
+        
+        Uncached searches over a knowledge base of OFFLOAD_MIN_DOCUMENTS or
+        more run in CPU_POOL, so a long scoring pass doesn't hold up other
+        clients' I/O. Scoring is pure Python and holds the GIL, so this
+        interleaves work rather than parallelizing it; smaller calls run
+        inline because the thread hand-off costs more than the work.
+        """
+        try:
+            key = (tool_name, tuple(sorted(arguments.items())))
+            result = self._cache.get(key)
+        except TypeError:
+            # Unhashable arguments can't be cached
+            key = result = None
+        
+        if result is None:
+            generation = self.rag.generation
+            if tool_name == "search_knowledge_base" and len(self.rag.documents) >= OFFLOAD_MIN_DOCUMENTS:
+                loop = asyncio.get_running_loop()
+                result = await loop.run_in_executor(CPU_POOL, self._call_tool, tool_name, arguments)
+            else:
+                result = self._call_tool(tool_name, arguments)
+            if result is None:
+                return {
+                    "error": f"Unknown tool: {tool_name}"
+                }
+            # Don't cache a result computed against an index that refresh()
+            # has since replaced
+            if key is not None and generation == self.rag.generation:
+                self._cache[key] = result
+                if len(self._cache) > TOOL_CACHE_SIZE:
+                    self._cache.popitem(last=False)
+        else:
+            self._cache.move_to_end(key)
+        
+        results, metadata = result
+        return {
+            # Convert to cards
+            "content": [document_to_card(doc) for doc in results],
+            "metadata": dict(metadata),
+        }
+    
+    def refresh(self):
+        """Rebuild the knowledge base indexes and drop all cached results
+        
+        Call this after modifying the knowledge base.
+        """
+        self.rag.refresh()
+        self._cache.clear()
+    
+    def _call_tool(
+        self, tool_name: str, arguments: Dict[str, Any]
+    ) -> Optional[Tuple[Tuple[Document, ...], Dict[str, Any]]]:
+        """Run a tool call without caching, returning its documents and metadata"""
         
         if tool_name == "search_knowledge_base":
             query = arguments.get("query", "")
@@ -234,16 +517,10 @@ class MCPServer:
             # Search documents
             results = self.rag.search(query, max_results)
             
-            # Convert to cards
-            cards = [document_to_card(doc) for doc in results]
-            
-            return {
-                "content": cards,
-                "metadata": {
-                    "query": query,
-                    "results_count": len(results),
-                    "tool": "search_knowledge_base"
-                }
+            return tuple(results), {
+                "query": query,
+                "results_count": len(results),
+                "tool": "search_knowledge_base"
             }
         
         elif tool_name == "get_recent_updates":
@@ -252,15 +529,9 @@ class MCPServer:
             # Get recent documents
             results = self.rag.get_recent(max_results)
             
-            # Convert to cards
-            cards = [document_to_card(doc) for doc in results]
-            
-            return {
-                "content": cards,
-                "metadata": {
-                    "results_count": len(results),
-                    "tool": "get_recent_updates"
-                }
+            return tuple(results), {
+                "results_count": len(results),
+                "tool": "get_recent_updates"
             }
         
         elif tool_name == "get_by_category":
@@ -270,22 +541,14 @@ class MCPServer:
             # Get documents by category
             results = self.rag.get_by_category(category, max_results)
             
-            # Convert to cards
-            cards = [document_to_card(doc) for doc in results]
-            
-            return {
-                "content": cards,
-                "metadata": {
-                    "category": category,
-                    "results_count": len(results),
-                    "tool": "get_by_category"
-                }
+            return tuple(results), {
+                "category": category,
+                "results_count": len(results),
+                "tool": "get_by_category"
             }
         
         else:
-            return {
-                "error": f"Unknown tool: {tool_name}"
-            }
+            return None
 
 
 async def main():
@@ -330,4 +593,10 @@ async def main():
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    # Use uvloop's faster event loop when it's installed
+    try:
+        import uvloop
+    except ImportError:
+        asyncio.run(main())
+    else:
+        uvloop.run(main())
@@ -6,11 +6,78 @@ Demonstrates how to create an MCP server that returns View components
 
 import asyncio
 import json
-from typing import Any, Dict, List
+import time
+from collections import OrderedDict
+from typing import Any, AsyncIterator, Dict, List, Tuple
 from datetime import datetime
 
 # Simulated MCP server (you'd use the actual MCP Python SDK)
 
+# Seconds a fetched forecast is reused before fetching again
+WEATHER_CACHE_TTL = 300
+# Most locations kept in the forecast cache
+WEATHER_CACHE_SIZE = 256
+
+# Streamed samples are sent in batches of at most this many points...
+STREAM_BATCH_SIZE = 32
+# ...or whatever arrived within this many seconds of the batch's first point.
+# The demo's simulated source produces a point every 300 ms, so there every
+# batch holds one point and the window only delays it; merging kicks in for
+# sources that produce points faster than this.
+STREAM_BATCH_WINDOW = 0.05
+
+# Gauge thresholds as (value, color, label); immutable, so get_weather
+# expands them into fresh dicts for each response
+TEMPERATURE_THRESHOLDS = (
+    (0, "#3b82f6", "Cold"),
+    (15, "#10b981", "Mild"),
+    (25, "#f59e0b", "Warm"),
+    (35, "#ef4444", "Hot"),
+)
+
+
+async def batch_samples(
+    samples: AsyncIterator[Any], max_size: int, max_delay: float
+) -> AsyncIterator[List[Any]]:
+    """
+    Group an async stream into lists, flushing when a batch is full or
+    max_delay seconds after its first item arrived
+    """
+    loop = asyncio.get_running_loop()
+    iterator = samples.__aiter__()
+    batch: List[Any] = []
+    deadline = 0.0
+    pending = None
+
+    try:
+        while True:
+            if pending is None:
+                pending = asyncio.ensure_future(iterator.__anext__())
+            timeout = max(deadline - loop.time(), 0) if batch else None
+            # Wait without cancelling, so a slow item is kept for the next batch
+            done, _ = await asyncio.wait({pending}, timeout=timeout)
+
+            if done:
+                try:
+                    item = pending.result()
+                except StopAsyncIteration:
+                    if batch:
+                        yield batch
+                    return
+                pending = None
+                if not batch:
+                    deadline = loop.time() + max_delay
+                batch.append(item)
+                if len(batch) < max_size:
+                    continue
+
+            yield batch
+            batch = []
+    finally:
+        # The consumer may stop early; don't leave a read pending
+        if pending is not None and not pending.done():
+            pending.cancel()
+
 
 class ChameleonMCPServer:
     """Example MCP Server with Chameleon View support"""
@@ -21,20 +88,72 @@ class ChameleonMCPServer:
             "analyze_data": self.analyze_data,
             "create_task": self.create_task,
         }
+        # location -> (fetch time, fetch task shared by concurrent callers)
+        self._weather_cache: "OrderedDict[str, Tuple[float, asyncio.Task]]" = OrderedDict()
 
-    async def get_weather(self, location: str) -> Dict[str, Any]:
+    async def _fetch_weather(self, location: str) -> Dict[str, Any]:
         """
-        Get weather information and return as a gauge + card view
+        Fetch current conditions for a location from the weather provider
+
+        In production this is a request through a shared, keep-alive HTTP
+        client (e.g. one httpx.AsyncClient per server process).
         """
-        # Simulate fetching weather data
+        # Simulate the provider's response time
         await asyncio.sleep(0.5)
-        
-        temperature = 22
-        forecast = [
-            {"day": "Mon", "temp": 21, "condition": "Sunny"},
-            {"day": "Tue", "temp": 23, "condition": "Cloudy"},
-            {"day": "Wed", "temp": 19, "condition": "Rainy"},
+
+        return {
+            "temperature": 22,
+            "forecast": [
+                {"day": "Mon", "temp": 21, "condition": "Sunny"},
+                {"day": "Tue", "temp": 23, "condition": "Cloudy"},
+                {"day": "Wed", "temp": 19, "condition": "Rainy"},
+            ],
+        }
+
+    async def _get_cached_weather(self, location: str) -> Dict[str, Any]:
+        """
+        Return weather for a location, fetching at most once per TTL
+
+        Concurrent requests for the same location await a single fetch.
+        """
+        now = time.monotonic()
+        entry = self._weather_cache.get(location)
+        if entry is None or now - entry[0] > WEATHER_CACHE_TTL:
+            self._evict_weather(now)
+            entry = (now, asyncio.ensure_future(self._fetch_weather(location)))
+            self._weather_cache[location] = entry
+            if len(self._weather_cache) > WEATHER_CACHE_SIZE:
+                self._weather_cache.popitem(last=False)
+        self._weather_cache.move_to_end(location)
+
+        try:
+            # Shield so one cancelled caller doesn't cancel the shared fetch
+            return await asyncio.shield(entry[1])
+        except Exception:
+            # Don't keep failed fetches around
+            if self._weather_cache.get(location) is entry:
+                del self._weather_cache[location]
+            raise
+
+    def _evict_weather(self, now: float) -> None:
+        """
+        Drop forecast cache entries older than the TTL
+        """
+        expired = [
+            location
+            for location, (fetched_at, _) in self._weather_cache.items()
+            if now - fetched_at > WEATHER_CACHE_TTL
         ]
+        for location in expired:
+            del self._weather_cache[location]
+
+    async def get_weather(self, location: str) -> Dict[str, Any]:
+        """
+        Get weather information and return as a gauge + card view
+        """
+        weather = await self._get_cached_weather(location)
+        temperature = weather["temperature"]
+        forecast = weather["forecast"]
 
         return {
             "content": [
@@ -52,10 +171,8 @@ class ChameleonMCPServer:
                         "unit": "°C",
                         "label": "Current Temperature",
                         "thresholds": [
-                            {"value": 0, "color": "#3b82f6", "label": "Cold"},
-                            {"value": 15, "color": "#10b981", "label": "Mild"},
-                            {"value": 25, "color": "#f59e0b", "label": "Warm"},
-                            {"value": 35, "color": "#ef4444", "label": "Hot"},
+                            {"value": value, "color": color, "label": label}
+                            for value, color, label in TEMPERATURE_THRESHOLDS
                         ],
                         "display_mode": "arc",
                     },
@@ -94,7 +211,9 @@ class ChameleonMCPServer:
                         "chart_type": "line",
                         "data": {
                             "labels": [],
-                            "datasets": [{"label": "Sales", "data": [], "color": "#6366f1"}],
+                            "datasets": [
+                                {"label": "Sales", "data": [], "color": "#6366f1", "fill": True}
+                            ],
                         },
                         "options": {"title": "Sales Analysis", "animations": True},
                     },
@@ -104,31 +223,26 @@ class ChameleonMCPServer:
             },
         }
 
-        # Simulate streaming data points
-        labels = ["Jan", "Feb", "Mar", "Apr", "May", "Jun"]
-        data = [10, 20, 15, 35, 40, 38]
+        data = []
 
-        for i, (label, value) in enumerate(zip(labels, data)):
-            await asyncio.sleep(0.3)
+        # Stream only the new points, grouping samples that arrive close together
+        async for batch in batch_samples(
+            self._sales_samples(), STREAM_BATCH_SIZE, STREAM_BATCH_WINDOW
+        ):
+            labels = [label for label, _ in batch]
+            values = [value for _, value in batch]
+            data.extend(values)
 
             yield {
                 "event": "ui_delta",
                 "data": {
                     "delta": {
                         "target_id": stream_id,
-                        "operation": "update",
+                        "operation": "append",
+                        # Only the new points; the chart keeps the dataset's
+                        # label, color and fill from the skeleton
                         "payload": {
-                            "data": {
-                                "labels": labels[: i + 1],
-                                "datasets": [
-                                    {
-                                        "label": "Sales",
-                                        "data": data[: i + 1],
-                                        "color": "#6366f1",
-                                        "fill": True,
-                                    }
-                                ],
-                            }
+                            "data": {"labels": labels, "datasets": [{"data": values}]}
                         },
                         "timestamp": int(datetime.now().timestamp() * 1000),
                     }
@@ -149,6 +263,18 @@ class ChameleonMCPServer:
                 },
             }
 
+    async def _sales_samples(self) -> AsyncIterator[Tuple[str, int]]:
+        """
+        Produce (label, value) samples as the analysis computes them
+        """
+        # Simulate streaming data points
+        labels = ["Jan", "Feb", "Mar", "Apr", "May", "Jun"]
+        data = [10, 20, 15, 35, 40, 38]
+
+        for label, value in zip(labels, data):
+            await asyncio.sleep(0.3)
+            yield label, value
+
     async def create_task(self) -> Dict[str, Any]:
         """
         Create a task by showing a dynamic form
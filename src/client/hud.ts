@@ -128,7 +128,7 @@ export class HUD {
      */
     private applyDelta(delta: any): void {
         // Find component instance and update
-        this.config.registry.update(delta.target_id, delta.payload);
+        this.config.registry.update(delta.target_id, delta.payload, delta.operation);
     }
 
     /**
@@ -3,6 +3,7 @@
  */
 
 import { ComponentDefinition, createComponentWrapper } from '../core/component-registry';
+import { DeltaOperation } from '../protocol/types';
 
 export interface ChartProps {
     chart_type: 'line' | 'bar' | 'pie' | 'scatter' | 'area';
@@ -75,14 +76,20 @@ export const ChartComponent: ComponentDefinition = {
             renderChart(ctx, props);
         }
 
+        let currentProps = props;
+
         return {
             element: wrapper,
-            update: (newProps: ChartProps) => {
+            update: (newProps: ChartProps, operation?: DeltaOperation) => {
+                // Appends carry only new points; extend the current series
+                currentProps =
+                    operation === 'append' ? appendChartData(currentProps, newProps.data) : newProps;
+
                 const ctx = canvas.getContext('2d');
                 if (ctx) {
                     // Clear and re-render
                     ctx.clearRect(0, 0, canvas.width, canvas.height);
-                    renderChart(ctx, newProps);
+                    renderChart(ctx, currentProps);
                 }
             },
             destroy: () => {
@@ -92,6 +99,19 @@ export const ChartComponent: ComponentDefinition = {
     },
 };
 
+/**
+ * Extend labels and each dataset's values with newly streamed points
+ */
+function appendChartData(props: ChartProps, data: Partial<ChartProps['data']> = {}): ChartProps {
+    const labels = [...(props.data.labels || []), ...(data.labels || [])];
+    const datasets = props.data.datasets.map((dataset, i) => ({
+        ...dataset,
+        data: [...dataset.data, ...(data.datasets?.[i]?.data || [])],
+    }));
+
+    return { ...props, data: { ...props.data, labels, datasets } };
+}
+
 function createLegend(datasets: Array<{ label?: string; color?: string }>): HTMLElement {
     const legend = document.createElement('div');
     legend.className = 'chart-legend';
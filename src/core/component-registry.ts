@@ -2,7 +2,7 @@
  * Component Registry - Dynamic component loading and management
  */
 
-import { ViewContent } from '../protocol/types';
+import { DeltaOperation, ViewContent } from '../protocol/types';
 
 // ============================================================================
 // Component Definition Types
@@ -18,7 +18,7 @@ export interface ComponentDefinition {
 
 export interface ComponentInstance {
     element: HTMLElement;
-    update?: (props: ComponentProps) => void;
+    update?: (props: ComponentProps, operation?: DeltaOperation) => void;
     destroy?: () => void;
 }
 
@@ -133,8 +133,11 @@ export class ComponentRegistry {
 
     /**
      * Update an existing component instance
+     *
+     * `operation` is the delta operation that produced the props; components
+     * that support incremental updates (e.g. 'append') use it to merge them.
      */
-    update(instanceId: string, props: ComponentProps): void {
+    update(instanceId: string, props: ComponentProps, operation?: DeltaOperation): void {
         const instance = this.instances.get(instanceId);
 
         if (!instance) {
@@ -143,7 +146,7 @@ export class ComponentRegistry {
         }
 
         if (instance.update) {
-            instance.update(props);
+            instance.update(props, operation);
         } else {
             console.warn(`Component instance "${instanceId}" does not support updates`);
         }